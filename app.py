@@ -1,15 +1,22 @@
 import streamlit as st
 from sqlalchemy import text 
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import altair as alt
 
 # --- Configuration ---
 ADMIN_PASSWORD = st.secrets["admin_password"]
+BOOKINGS_PAGE_SIZE = 50
 
 # --- Database Setup ---
+# Cached so the DDL below runs once per process, not on every rerun/session
+@st.cache_resource
 def init_db():
-    conn = st.connection("postgresql", type="sql")
+    conn = st.connection(
+        "postgresql", type="sql",
+        pool_size=10, max_overflow=20, pool_pre_ping=True, pool_recycle=1800,
+    )
     with conn.session as s:
         s.execute(text('''CREATE TABLE IF NOT EXISTS robots (
                         id SERIAL PRIMARY KEY,
@@ -28,24 +35,127 @@ def init_db():
                         robot_id INTEGER,
                         operator_id INTEGER,
                         project_name TEXT,
-                        start_time TIMESTAMP,
-                        end_time TIMESTAMP,
-                        FOREIGN KEY(robot_id) REFERENCES robots(id),
-                        FOREIGN KEY(operator_id) REFERENCES operators(id)
+                        start_time TIMESTAMPTZ,
+                        end_time TIMESTAMPTZ,
+                        FOREIGN KEY(robot_id) REFERENCES robots(id) ON DELETE CASCADE,
+                        FOREIGN KEY(operator_id) REFERENCES operators(id) ON DELETE CASCADE
                     );'''))
+        # --- Schema Migrations ---
+        s.execute(text("ALTER TABLE robots ADD COLUMN IF NOT EXISTS image_url TEXT;"))
+        s.execute(text("ALTER TABLE operators ADD COLUMN IF NOT EXISTS supervisor TEXT;"))
+        # Switch foreign keys created before ON DELETE CASCADE over to cascading deletes
+        s.execute(text('''DO $$
+                    BEGIN
+                        IF EXISTS (SELECT 1 FROM pg_constraint
+                                   WHERE conname = 'schedule_robot_id_fkey' AND confdeltype <> 'c') THEN
+                            ALTER TABLE schedule DROP CONSTRAINT schedule_robot_id_fkey,
+                                ADD CONSTRAINT schedule_robot_id_fkey
+                                FOREIGN KEY (robot_id) REFERENCES robots(id) ON DELETE CASCADE;
+                        END IF;
+                        IF EXISTS (SELECT 1 FROM pg_constraint
+                                   WHERE conname = 'schedule_operator_id_fkey' AND confdeltype <> 'c') THEN
+                            ALTER TABLE schedule DROP CONSTRAINT schedule_operator_id_fkey,
+                                ADD CONSTRAINT schedule_operator_id_fkey
+                                FOREIGN KEY (operator_id) REFERENCES operators(id) ON DELETE CASCADE;
+                        END IF;
+                    END $$;'''))
+        # Convert naive TIMESTAMP columns to TIMESTAMPTZ; schedule_full depends on them and is recreated below.
+        # Naive values are the times users typed into Create Booking, which are now defined as UTC.
+        s.execute(text('''DO $$
+                    BEGIN
+                        IF EXISTS (SELECT 1 FROM information_schema.columns
+                                   WHERE table_name = 'schedule' AND column_name = 'start_time'
+                                   AND data_type = 'timestamp without time zone') THEN
+                            DROP MATERIALIZED VIEW IF EXISTS schedule_full;
+                            ALTER TABLE schedule
+                                ALTER COLUMN start_time TYPE TIMESTAMPTZ USING start_time AT TIME ZONE 'UTC',
+                                ALTER COLUMN end_time TYPE TIMESTAMPTZ USING end_time AT TIME ZONE 'UTC';
+                        END IF;
+                    END $$;'''))
+        s.execute(text('''CREATE TABLE IF NOT EXISTS operator_skills (
+                        operator_id INTEGER REFERENCES operators(id) ON DELETE CASCADE,
+                        model TEXT,
+                        PRIMARY KEY(operator_id, model)
+                    );'''))
+        s.execute(text("CREATE INDEX IF NOT EXISTS idx_skills_model ON operator_skills (model);"))
+        # Backfill skills for operators created before operator_skills existed
+        s.execute(text('''INSERT INTO operator_skills (operator_id, model)
+                        SELECT o.id, trim(m) FROM operators o, unnest(string_to_array(o.qualified_models, ',')) AS m
+                        WHERE trim(m) <> ''
+                        ON CONFLICT DO NOTHING;'''))
+        # Reject overlapping bookings of the same robot at INSERT time. Best effort: if the role
+        # can't create btree_gist or existing rows overlap, startup continues without it and the
+        # sidebar warns that double-booking protection is off.
+        s.execute(text('''DO $$
+                    BEGIN
+                        BEGIN
+                            CREATE EXTENSION IF NOT EXISTS btree_gist;
+                        EXCEPTION WHEN insufficient_privilege OR undefined_file THEN
+                            RAISE WARNING 'btree_gist unavailable: %', SQLERRM;
+                        END;
+                        IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'btree_gist')
+                           AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'no_overlap') THEN
+                            BEGIN
+                                ALTER TABLE schedule ADD CONSTRAINT no_overlap
+                                    EXCLUDE USING gist (robot_id WITH =, tstzrange(start_time, end_time) WITH &&);
+                            EXCEPTION WHEN exclusion_violation THEN
+                                RAISE WARNING 'no_overlap not added: schedule already contains overlapping bookings';
+                            END;
+                        END IF;
+                    END $$;'''))
+        s.execute(text("CREATE INDEX IF NOT EXISTS idx_schedule_active ON schedule (start_time, end_time);"))
+        s.execute(text("CREATE INDEX IF NOT EXISTS idx_schedule_robot_start ON schedule (robot_id, start_time DESC);"))
+        s.execute(text('''CREATE MATERIALIZED VIEW IF NOT EXISTS schedule_full AS
+                        SELECT s.id, r.name AS robot, o.name AS operator, s.project_name, s.start_time, s.end_time
+                        FROM schedule s
+                        JOIN robots r ON s.robot_id = r.id
+                        JOIN operators o ON s.operator_id = o.id;'''))
+        # Unique index is required for REFRESH ... CONCURRENTLY
+        s.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_schedule_full_id ON schedule_full (id);"))
         s.commit()
     return conn
 
 conn = init_db()
 
+# --- Statements ---
+# Schedule insert statement, shared by Create Booking
+INSERT_SCHEDULE = text('''
+    INSERT INTO schedule (robot_id, operator_id, project_name, start_time, end_time)
+    VALUES (:rid, :oid, :proj, :start, :end)
+''')
+
 # --- Helper Functions ---
+@st.cache_data(ttl=30, show_spinner=False)
+def _cached_query(query, params_frozen, arrow=False):
+    kwargs = {"dtype_backend": "pyarrow"} if arrow else {}
+    return conn.query(query, params=dict(params_frozen), ttl=0, **kwargs)
+
 def get_df(query, params=None):
-    return conn.query(query, params=params, ttl=0)
+    # Freeze params into a sorted tuple so the cache key is hashable
+    return _cached_query(query, tuple(sorted((params or {}).items())))
+
+def get_arrow_df(query, params=None):
+    # Columnar Arrow-backed result: text columns avoid per-row Python str objects
+    return _cached_query(query, tuple(sorted((params or {}).items())), arrow=True)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def distinct_models():
+    df = conn.query("SELECT DISTINCT model FROM robots WHERE model IS NOT NULL", ttl=0)
+    return tuple(df['model'].dropna().tolist())
 
 def run_query(query, params=None):
+    if isinstance(query, str):
+        query = text(query)
     with conn.session as s:
-        s.execute(text(query), params)
+        s.execute(query, params)
+        # Deletes can cascade into schedule, so they refresh the view as well
+        sql = query.text.lower()
+        if "schedule" in sql or sql.lstrip().startswith("delete"):
+            s.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY schedule_full"))
         s.commit()
+    _cached_query.clear()
+    if "robots" in sql:
+        distinct_models.clear()
 
 def check_password():
     def password_entered():
@@ -72,20 +182,31 @@ if check_password():
 
     # --- Sidebar ---
     st.sidebar.header("Status Center")
-    total_robots_df = get_df("SELECT count(*) as count FROM robots")
-    total_robots = total_robots_df.iloc[0]['count'] if not total_robots_df.empty else 0
-    
-    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    active_jobs_df = get_df("SELECT count(*) as count FROM schedule WHERE start_time <= :now AND end_time >= :now", params={"now": now_str})
-    active_jobs = active_jobs_df.iloc[0]['count'] if not active_jobs_df.empty else 0
-    
-    available_robots = total_robots - active_jobs
+    # A robot is busy if any of its bookings covers now(); counted per robot, not per booking
+    status_df = get_df('''
+        SELECT count(*) FILTER (WHERE busy IS NULL) AS available, count(*) AS total,
+               EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'no_overlap') AS overlap_guard,
+               (SELECT count(*) FROM schedule_full) AS bookings
+        FROM (
+            SELECT r.id, MAX(s.id) FILTER (WHERE s.start_time <= now() AND s.end_time >= now()) AS busy
+            FROM robots r
+            LEFT JOIN schedule s ON s.robot_id = r.id
+            GROUP BY r.id
+        ) t
+    ''')
+    row = status_df.iloc[0]
+    total_robots = row['total']
+    available_robots = row['available']
     
     if available_robots > 0:
         st.sidebar.success(f"🟢 Available Robots: {available_robots} / {total_robots}")
     else:
         st.sidebar.error(f"🔴 All Robots In Use ({total_robots}/{total_robots})")
     
+    if not row['overlap_guard']:
+        st.sidebar.warning("⚠️ Double-booking protection is off (no_overlap constraint missing). "
+                           "Check btree_gist privileges and overlapping bookings.")
+    
     # Added "Manage Bookings" to the menu
     menu = st.sidebar.radio("Menu", ["Dashboard & Calendar", "Manage Bookings", "Manage Robots", "Manage Operators", "Create Booking"])
 
@@ -93,21 +214,27 @@ if check_password():
     if menu == "Dashboard & Calendar":
         st.header("Operational Schedule")
         query = '''
-            SELECT s.id, r.name as robot, o.name as operator, s.project_name, s.start_time, s.end_time
-            FROM schedule s
-            JOIN robots r ON s.robot_id = r.id
-            JOIN operators o ON s.operator_id = o.id
-            ORDER BY s.start_time DESC
+            SELECT robot, operator, project_name, start_time, end_time
+            FROM schedule_full
+            WHERE end_time >= now() - interval '7 days' AND start_time <= now() + interval '30 days'
+            ORDER BY start_time DESC
+            LIMIT 500
         '''
-        df = get_df(query)
+        df = get_arrow_df(query)
         
         if not df.empty:
-            df['start_time'] = pd.to_datetime(df['start_time'])
-            df['end_time'] = pd.to_datetime(df['end_time'])
+            # The driver usually returns datetimes already; only parse when it didn't
+            for col in ('start_time', 'end_time'):
+                if not pd.api.types.is_datetime64_any_dtype(df[col]):
+                    df[col] = pd.to_datetime(df[col], utc=True, cache=True)
             
+            # Bookings are entered and stored in UTC, so render them in UTC rather than browser-local time
             chart = alt.Chart(df).mark_bar().encode(
-                x='start_time', x2='end_time', y='robot', color='operator',
-                tooltip=['project_name', 'operator', 'start_time', 'end_time']
+                x=alt.X('start_time:T', scale=alt.Scale(type='utc'), title='Time (UTC)'),
+                x2='end_time', y='robot', color='operator',
+                tooltip=['project_name', 'operator',
+                         alt.Tooltip('start_time:T', format='%Y-%m-%d %H:%M', formatType='utc'),
+                         alt.Tooltip('end_time:T', format='%Y-%m-%d %H:%M', formatType='utc')]
             ).interactive()
             st.altair_chart(chart, use_container_width=True)
         else:
@@ -118,23 +245,27 @@ if check_password():
         st.header("Manage Schedule Entries")
         st.info("To Edit: Delete the incorrect entry and create a new one.")
         
+        # Booking count comes from the sidebar's status query, so the bound costs no extra round-trip
+        page_count = max(1, -(-int(row['bookings']) // BOOKINGS_PAGE_SIZE))
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
         query = '''
-            SELECT s.id, r.name as robot, o.name as operator, s.project_name, s.start_time, s.end_time
-            FROM schedule s
-            JOIN robots r ON s.robot_id = r.id
-            JOIN operators o ON s.operator_id = o.id
-            ORDER BY s.start_time DESC
+            SELECT id, robot, operator, project_name, start_time, end_time
+            FROM schedule_full
+            ORDER BY start_time DESC
+            LIMIT :limit OFFSET :offset
         '''
-        df = get_df(query)
+        df = get_arrow_df(query, params={"limit": BOOKINGS_PAGE_SIZE, "offset": (page - 1) * BOOKINGS_PAGE_SIZE})
         
         if not df.empty:
-            # Show the table
-            st.dataframe(df)
+            # Build the dropdown labels once, alongside the table data
+            # Format: "ID: 5 | Spot @ Site A"
+            df['label'] = "ID: " + df['id'].astype(str) + " | " + df['robot'] + " @ " + df['project_name'].fillna('')
+
+            # Show the table (label column hidden rather than dropped, to avoid a copy)
+            st.dataframe(df, column_order=[c for c in df.columns if c != 'label'])
             
             st.subheader("Delete a Booking")
-            # Create a dropdown to select ID to delete
-            # Format: "ID: 5 | Robot: Spot | Project: Site A"
-            options = {f"ID: {row['id']} | {row['robot']} @ {row['project_name']}": row['id'] for index, row in df.iterrows()}
+            options = dict(zip(df['label'], df['id']))
             selected_option = st.selectbox("Select Booking to Remove", list(options.keys()))
             
             if st.button("🗑️ Delete Selected Booking", type="primary"):
@@ -153,8 +284,13 @@ if check_password():
             with st.form("add_robot"):
                 r_name = st.text_input("Robot Name")
                 r_model = st.text_input("Model")
+                r_image = st.text_input("Image URL (Optional)")
+                
                 if st.form_submit_button("Add Robot") and r_name:
-                    run_query("INSERT INTO robots (name, model) VALUES (:name, :model)", {"name": r_name, "model": r_model})
+                    run_query(
+                        "INSERT INTO robots (name, model, image_url) VALUES (:name, :model, :image)", 
+                        {"name": r_name, "model": r_model, "image": r_image}
+                    )
                     st.rerun()
             
             # Delete Robot Feature
@@ -164,57 +300,78 @@ if check_password():
             if not all_robots.empty:
                 r_to_del = st.selectbox("Select Robot to Delete", all_robots['name'])
                 if st.button("Delete Robot"):
-                    # Warning: This might fail if robot has schedule history (foreign key constraint)
-                    # So we ideally delete schedule first, but for now just try
-                    try:
-                        run_query("DELETE FROM robots WHERE name = :name", {"name": r_to_del})
-                        st.success("Robot Deleted")
-                        st.rerun()
-                    except Exception as e:
-                        st.error("Cannot delete: This robot has existing schedule history.")
+                    # Schedule history is removed with the robot (ON DELETE CASCADE)
+                    run_query("DELETE FROM robots WHERE name = :name", {"name": r_to_del})
+                    st.success("Robot Deleted")
+                    st.rerun()
                         
         with col2:
-            st.dataframe(get_df("SELECT * FROM robots"))
+            st.dataframe(get_df("SELECT id, name, model, status, image_url FROM robots"))
 
     # --- 4. Manage Operators ---
     elif menu == "Manage Operators":
         st.header("Operator Team")
         col1, col2 = st.columns([1, 2])
         try:
-            existing_models = get_df("SELECT DISTINCT model FROM robots")['model'].tolist()
-        except:
+            existing_models = list(distinct_models())
+        except SQLAlchemyError as e:
+            st.warning(f"DB unavailable: {e}")
             existing_models = []
         
         with col1:
             with st.form("add_op"):
                 o_name = st.text_input("Operator Name")
                 o_role = st.selectbox("Role", ["Senior Engineer", "Field Technician"])
+                o_supervisor = st.text_input("Supervisor In Charge")
                 o_skills = st.multiselect("Trained On Models", existing_models)
+                
                 if st.form_submit_button("Add Operator") and o_name:
                     skills_str = ",".join(o_skills)
-                    run_query("INSERT INTO operators (name, role, qualified_models) VALUES (:name, :role, :skills)", 
-                              {"name": o_name, "role": o_role, "skills": skills_str})
+                    # One statement inserts the operator and all of its skills, via run_query's invalidation path
+                    run_query('''
+                        WITH op AS (
+                            INSERT INTO operators (name, role, qualified_models, supervisor)
+                            VALUES (:name, :role, :skills, :sup)
+                            RETURNING id
+                        )
+                        INSERT INTO operator_skills (operator_id, model)
+                        SELECT op.id, m FROM op, unnest(CAST(:models AS TEXT[])) AS m
+                    ''', {"name": o_name, "role": o_role, "skills": skills_str, "sup": o_supervisor, "models": list(o_skills)})
                     st.success(f"Added {o_name}")
                     st.rerun()
         with col2:
-            st.dataframe(get_df("SELECT * FROM operators"))
+            st.dataframe(get_df("SELECT id, name, role, supervisor, qualified_models FROM operators"))
 
     # --- 5. Create Booking ---
     elif menu == "Create Booking":
         st.header("Schedule a Job")
-        robots = get_df("SELECT * FROM robots")
+        # Indexed by name so the selected robot is a hash lookup, not a boolean mask
+        # COALESCE so NULLs arrive as '' rather than NaN, which is truthy
+        robots = get_df(
+            "SELECT id, name, model, COALESCE(status, 'Unknown') AS status, COALESCE(image_url, '') AS image_url FROM robots"
+        ).drop_duplicates('name').set_index('name')
         if robots.empty:
             st.error("No robots available.")
         else:
-            selected_robot_name = st.selectbox("Select Robot", robots['name'])
-            selected_robot_model = robots[robots['name'] == selected_robot_name].iloc[0]['model']
-            st.info(f"Selected Robot Model: **{selected_robot_model}**")
+            selected_robot_name = st.selectbox("Select Robot", robots.index)
+            robot_details = robots.loc[selected_robot_name]
+            selected_robot_model = robot_details['model']
             
-            all_ops = get_df("SELECT * FROM operators")
-            if not all_ops.empty and 'qualified_models' in all_ops.columns:
-                valid_ops = all_ops[all_ops['qualified_models'].fillna('').str.contains(selected_robot_model, regex=False)]
-            else:
-                valid_ops = pd.DataFrame()
+            c1, c2 = st.columns([1, 3])
+            with c1:
+                if robot_details['image_url']:
+                    st.image(robot_details['image_url'], caption=selected_robot_name, use_container_width=True)
+                else:
+                    st.info("No image available")
+            with c2:
+                st.info(f"Model: **{selected_robot_model}** | Status: {robot_details['status']}")
+            
+            valid_ops = get_df('''
+                SELECT o.id, o.name, COALESCE(o.supervisor, '') AS supervisor
+                FROM operators o
+                JOIN operator_skills k ON k.operator_id = o.id
+                WHERE k.model = :model
+            ''', params={"model": selected_robot_model})
             
             if valid_ops.empty:
                 st.warning(f"⚠️ No operators trained on '{selected_robot_model}'.")
@@ -222,24 +379,36 @@ if check_password():
                 with st.form("booking_form"):
                     op_map = dict(zip(valid_ops['name'], valid_ops['id']))
                     selected_op_name = st.selectbox("Select Qualified Operator", valid_ops['name'])
+                    
+                    op_sup = dict(zip(valid_ops['name'], valid_ops['supervisor'])).get(selected_op_name)
+                    if op_sup:
+                        st.caption(f"Supervisor: {op_sup}")
+
+                    # All booking times are UTC, including the defaults
+                    default_start = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+                    default_end = default_start + timedelta(hours=4)
                     col1, col2 = st.columns(2)
                     with col1:
-                        start_d = st.date_input("Start Date")
-                        start_t = st.time_input("Start Time")
+                        start_d = st.date_input("Start Date (UTC)", value=default_start.date())
+                        start_t = st.time_input("Start Time (UTC)", value=default_start.time())
                     with col2:
-                        end_d = st.date_input("End Date")
-                        end_t = st.time_input("End Time", value=(datetime.now() + timedelta(hours=4)).time())
+                        end_d = st.date_input("End Date (UTC)", value=default_end.date())
+                        end_t = st.time_input("End Time (UTC)", value=default_end.time())
                     project = st.text_input("Project / Site Name")
                     
                     if st.form_submit_button("Confirm Schedule"):
-                        start_dt = datetime.combine(start_d, start_t)
-                        end_dt = datetime.combine(end_d, end_t)
-                        robot_id = int(robots[robots['name'] == selected_robot_name].iloc[0]['id'])
+                        # Bind aware datetimes so the session TimeZone is irrelevant
+                        start_dt = datetime.combine(start_d, start_t, tzinfo=timezone.utc)
+                        end_dt = datetime.combine(end_d, end_t, tzinfo=timezone.utc)
+                        robot_id = int(robot_details['id'])
                         if end_dt <= start_dt:
                             st.error("End time must be after start time.")
                         else:
-                            run_query('''
-                                INSERT INTO schedule (robot_id, operator_id, project_name, start_time, end_time)
-                                VALUES (:rid, :oid, :proj, :start, :end)
-                            ''', {"rid": robot_id, "oid": op_map[selected_op_name], "proj": project, "start": start_dt, "end": end_dt})
-                            st.success("Schedule Saved!")
\ No newline at end of file
+                            try:
+                                run_query(INSERT_SCHEDULE, {"rid": robot_id, "oid": op_map[selected_op_name], "proj": project, "start": start_dt, "end": end_dt})
+                                st.success("Schedule Saved!")
+                            except IntegrityError as e:
+                                # 23P01 = exclusion_violation (no_overlap); other integrity errors are real failures
+                                if getattr(e.orig, "pgcode", None) != "23P01":
+                                    raise
+                                st.error("Robot already booked in that window.")
\ No newline at end of file